@@ -0,0 +1,198 @@
+# chatapp/admission.py
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Lower value = served first
+INTERACTIVE = 0
+SUMMARY = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    INTERACTIVE: "interactive",
+    SUMMARY: "summary",
+    BACKGROUND: "background",
+}
+
+
+class Rejected(Exception):
+    """Raised when LLM-bound work can't be admitted in time."""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded, priority-ordered gate in front of the local LLM.
+
+    At most `max_concurrency` jobs run at once and at most `max_queue` wait.
+    Work whose predicted queue wait already exceeds its deadline is turned
+    away immediately instead of hanging. The controller is per process, so
+    the limits apply to each web worker separately.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int,
+                 initial_service_time: float = 5.0, ewma_alpha: float = 0.2):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.ewma_alpha = ewma_alpha
+        self._service_time = initial_service_time
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of [priority, seq, granted, evicted_with]
+        self._seq = itertools.count()
+        self._active = 0
+        self._stats = {
+            name: {
+                "admitted": 0,
+                "rejected": {"queue_full": 0, "deadline": 0, "timeout": 0},
+                "wait_seconds_total": 0.0,
+                "wait_seconds_max": 0.0,
+            }
+            for name in PRIORITY_NAMES.values()
+        }
+
+    def _predicted_wait(self, priority: int) -> float:
+        ahead = sum(1 for entry in self._waiting if entry[0] <= priority)
+        needed = self._active + ahead - self.max_concurrency + 1
+        if needed <= 0:
+            return 0.0
+        return needed * self._service_time / self.max_concurrency
+
+    def _dispatch(self):
+        granted = False
+        while self._waiting and self._active < self.max_concurrency:
+            entry = heapq.heappop(self._waiting)
+            entry[2] = True
+            self._active += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _rejection(self, priority: int, status: int, reason: str, retry_after: float) -> Rejected:
+        self._stats[PRIORITY_NAMES[priority]]["rejected"][reason] += 1
+        return Rejected(status, reason, max(1, math.ceil(retry_after)))
+
+    def _reject(self, priority: int, status: int, reason: str, retry_after: float):
+        raise self._rejection(priority, status, reason, retry_after)
+
+    def _check(self, priority: int, deadline: float, evict: bool):
+        if len(self._waiting) >= self.max_queue:
+            # A full queue turns away its lowest-priority (then newest) waiter,
+            # unless the newcomer ranks at or below every waiter
+            worst = max(self._waiting, key=lambda entry: (entry[0], entry[1]))
+            if worst[0] <= priority:
+                self._reject(priority, 503, "queue_full", self._predicted_wait(priority))
+            if evict:
+                retry_after = self._predicted_wait(worst[0])
+                self._waiting.remove(worst)
+                heapq.heapify(self._waiting)
+                worst[3] = self._rejection(worst[0], 503, "queue_full", retry_after)
+                self._cond.notify_all()
+
+        predicted = self._predicted_wait(priority)
+        if predicted > deadline:
+            self._reject(priority, 429, "deadline", predicted)
+
+    def check(self, priority: int, deadline: float):
+        """Raise Rejected now, without queueing, if the work couldn't be admitted in time."""
+        with self._cond:
+            self._check(priority, deadline, evict=False)
+
+    def acquire(self, priority: int, deadline: float):
+        """Block until a slot is free or raise Rejected."""
+        with self._cond:
+            self._check(priority, deadline, evict=True)
+
+            enqueued = time.monotonic()
+            expires = enqueued + deadline
+            entry = [priority, next(self._seq), False, None]
+            heapq.heappush(self._waiting, entry)
+            self._dispatch()
+
+            while not entry[2]:
+                if entry[3] is not None:
+                    raise entry[3]
+                remaining = expires - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._reject(priority, 503, "timeout", self._service_time)
+                self._cond.wait(remaining)
+
+            waited = time.monotonic() - enqueued
+            stats = self._stats[PRIORITY_NAMES[priority]]
+            stats["admitted"] += 1
+            stats["wait_seconds_total"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+
+    def release(self, service_time: float):
+        with self._cond:
+            self._active -= 1
+            self._service_time += self.ewma_alpha * (service_time - self._service_time)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: int, deadline: float):
+        self.acquire(priority, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": len(self._waiting),
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "service_time_estimate": round(self._service_time, 3),
+                "priorities": {
+                    name: {
+                        **stats,
+                        "rejected": dict(stats["rejected"]),
+                        "wait_seconds_avg": (
+                            stats["wait_seconds_total"] / stats["admitted"]
+                            if stats["admitted"] else 0.0
+                        ),
+                    }
+                    for name, stats in self._stats.items()
+                },
+            }
+
+
+controller = AdmissionController(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+)
+
+
+def llm_timeout(expires: float) -> float:
+    """Timeout for an LM Studio call: LLM_TIMEOUT, cut short by the request's deadline."""
+    return max(0.1, min(settings.LLM_TIMEOUT, expires - time.monotonic()))
+
+
+def request_deadline(request, priority: int) -> float:
+    """
+    Deadline in seconds for this request: the per-priority default from
+    settings, optionally shortened by an `X-Request-Timeout` header. It
+    bounds both the wait for a slot and the LM Studio call itself.
+    """
+    deadline = settings.LLM_DEADLINES[PRIORITY_NAMES[priority]]
+    header = request.headers.get("X-Request-Timeout")
+    if header:
+        try:
+            deadline = min(deadline, max(0.0, float(header)))
+        except ValueError:
+            pass
+    return deadline
@@ -1,13 +1,14 @@
 import requests
 import json
-from sentence_transformers import SentenceTransformer
-_local_model = SentenceTransformer("all-MiniLM-L6-v2")
+from django.conf import settings
+from .embeddings import get_model
 LM_STUDIO_API_URL = "http://localhost:1234/v1/chat/completions"
 
-def generate_summary(messages):
+def generate_summary(messages, timeout=None):
     """
     Generates a conversation summary using a locally hosted LM Studio model.
     messages: list of {'sender': 'user'/'ai', 'content': 'text'}
+    timeout: seconds to wait for LM Studio (defaults to settings.LLM_TIMEOUT)
     """
     transcript = "\n".join([f"{m['sender']}: {m['content']}" for m in messages])
     prompt = f"""
@@ -29,7 +30,7 @@ def generate_summary(messages):
     }
 
     try:
-        response = requests.post(LM_STUDIO_API_URL, json=payload)
+        response = requests.post(LM_STUDIO_API_URL, json=payload, timeout=timeout or settings.LLM_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         return data["choices"][0]["message"]["content"].strip()
@@ -44,7 +45,7 @@ def embed_text(text: str):
     Works fully offline (no API calls).
     """
     try:
-        vector = _local_model.encode([text])[0]
+        vector = get_model().encode([text])[0]
         return vector.tolist()
     except Exception as e:
         print(f"Embedding generation failed: {e}")
@@ -0,0 +1,56 @@
+# chatapp/compression.py
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+_accepts_br = re.compile(r"\bbr\b")
+_accepts_gzip = re.compile(r"\bgzip\b")
+
+
+class CompressionMiddleware:
+    """
+    Brotli (if installed) or gzip for JSON responses larger than
+    `COMPRESS_MIN_LENGTH` bytes, picked from the client's Accept-Encoding.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if not response.get("Content-Type", "").startswith("application/json"):
+            return response
+        if len(response.content) < settings.COMPRESS_MIN_LENGTH:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accept = request.headers.get("Accept-Encoding", "")
+        if brotli is not None and _accepts_br.search(accept):
+            encoding, compressed = "br", brotli.compress(response.content, quality=5)
+        elif _accepts_gzip.search(accept):
+            encoding, compressed = "gzip", compress_string(response.content)
+        else:
+            return response
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+
+        # The body bytes changed, so a strong ETag no longer applies
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
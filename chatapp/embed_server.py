@@ -0,0 +1,165 @@
+# chatapp/embed_server.py
+import errno
+import os
+import queue
+import socket
+import socketserver
+import threading
+
+from .embeddings import encode_local, get_model, pack_vector, read_text
+
+
+class _Job:
+    """A single text waiting to be encoded, plus the slot its vector lands in."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.vector = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts from all connections and encodes them together, so one
+    forward pass serves several web workers at once.
+    """
+
+    def __init__(self, model_name: str, max_batch: int = 32, max_wait: float = 0.01):
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"embed-batcher-{model_name}", daemon=True)
+        self.ready = threading.Event()
+        self.load_error = None
+
+    def start(self):
+        """Load the model (possibly downloading it) and start batching."""
+        try:
+            get_model(self.model_name)
+        except Exception as e:
+            self.load_error = e
+        else:
+            self._thread.start()
+        finally:
+            self.ready.set()
+
+    def submit(self, text: str) -> list[float]:
+        job = _Job(text)
+        self._jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.vector
+
+    def _run(self):
+        while True:
+            batch = [self._jobs.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._jobs.get(timeout=self.max_wait))
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = encode_local([job.text for job in batch], self.model_name)
+                for job, vector in zip(batch, vectors):
+                    job.vector = vector
+            except Exception as e:
+                for job in batch:
+                    job.error = e
+            finally:
+                for job in batch:
+                    job.done.set()
+
+
+class _EmbedHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # A client may send several texts over one connection
+        while True:
+            try:
+                text = read_text(self.request)
+                model_name = read_text(self.request)
+            except ConnectionError:
+                return
+
+            try:
+                vector = self.server.batcher_for(model_name).submit(text)
+            except Exception as e:
+                # An empty vector is the error frame; the client falls back
+                print(f"❌ Embedding with {model_name} failed:", e)
+                vector = []
+
+            try:
+                self.request.sendall(pack_vector(vector))
+            except OSError:
+                return
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, max_batch: int = 32, max_wait: float = 0.01):
+        if os.path.exists(path):
+            if _socket_answers(path):
+                raise OSError(errno.EADDRINUSE, f"Another embedder is already listening on {path}")
+            # Left behind by an embedder that didn't shut down cleanly
+            os.unlink(path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._batchers = {}
+        self._batchers_lock = threading.Lock()
+        super().__init__(path, _EmbedHandler)
+
+    def server_bind(self):
+        # Only this user (i.e. the web workers) may connect: create the socket
+        # owner-only rather than chmod-ing it after it is already reachable
+        os.makedirs(os.path.dirname(self.server_address) or ".", mode=0o700, exist_ok=True)
+        old_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.server_address, 0o600)
+
+    def batcher_for(self, model_name: str) -> EmbeddingBatcher:
+        """
+        One batcher (and one loaded model) per embedding model requested.
+        Models load outside the lock so requests for models that are already
+        loaded never wait behind a new one.
+        """
+        with self._batchers_lock:
+            batcher = self._batchers.get(model_name)
+            loader = batcher is None
+            if loader:
+                batcher = self._batchers[model_name] = EmbeddingBatcher(
+                    model_name, self.max_batch, self.max_wait,
+                )
+
+        if loader:
+            batcher.start()
+        batcher.ready.wait()
+
+        if batcher.load_error is not None:
+            with self._batchers_lock:
+                if self._batchers.get(model_name) is batcher:
+                    del self._batchers[model_name]
+            raise batcher.load_error
+        return batcher
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def _socket_answers(path: str) -> bool:
+    """True if something is accepting connections on the Unix socket at `path`."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1.0)
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
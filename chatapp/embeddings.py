@@ -1,16 +1,118 @@
 # chatapp/embeddings.py
-from sentence_transformers import SentenceTransformer
+import socket
+import struct
+import threading
+import time
+
+from django.conf import settings
 
 # ✅ Use same dimension you created in migration (VECTOR(384))
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-# Load model once globally
-_model = SentenceTransformer(MODEL_NAME)
+# Wire format shared with the embedder sidecar (see chatapp/embed_server.py):
+#   request  -> uint32 byte length + UTF-8 text, then the model name framed the same way
+#   response -> uint32 vector length + that many little-endian float32 values;
+#               length 0 means the embedder failed to encode the text
+_HEADER = struct.Struct("!I")
+
+# Loaded lazily so web workers that talk to the sidecar never hold a copy
+_models = {}
+_model_lock = threading.Lock()
+
+# After the embedder fails or times out, skip it until this (monotonic) time
+# instead of paying EMBEDDER_TIMEOUT on every call
+_remote_down_until = 0.0
+
+
+def get_model(model_name: str = MODEL_NAME):
+    """Load a SentenceTransformer model on first use and reuse it afterwards."""
+    model = _models.get(model_name)
+    if model is None:
+        with _model_lock:
+            model = _models.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = _models[model_name] = SentenceTransformer(model_name)
+    return model
+
+
+def encode_local(texts: list[str], model_name: str = MODEL_NAME) -> list[list[float]]:
+    """Encode a batch of texts in-process with normalized embeddings."""
+    embeddings = get_model(model_name).encode(texts, normalize_embeddings=True)
+    return [e.tolist() for e in embeddings]
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly `size` bytes from the socket or raise ConnectionError."""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("embedder socket closed mid-frame")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def pack_text(text: str) -> bytes:
+    data = text.encode("utf-8")
+    return _HEADER.pack(len(data)) + data
+
+
+def pack_vector(vector) -> bytes:
+    return _HEADER.pack(len(vector)) + struct.pack(f"<{len(vector)}f", *vector)
 
-def embed_text(text: str) -> list[float]:
+
+def read_text(sock: socket.socket) -> str:
+    (size,) = _HEADER.unpack(recv_exact(sock, _HEADER.size))
+    return recv_exact(sock, size).decode("utf-8")
+
+
+def read_vector(sock: socket.socket) -> list[float]:
+    (dim,) = _HEADER.unpack(recv_exact(sock, _HEADER.size))
+    return list(struct.unpack(f"<{dim}f", recv_exact(sock, dim * 4)))
+
+
+def _embed_remote(text: str, model_name: str, path: str, timeout: float = None) -> list[float]:
+    if timeout is None:
+        timeout = getattr(settings, "EMBEDDER_TIMEOUT", 5.0)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(pack_text(text) + pack_text(model_name))
+        return read_vector(sock)
+
+
+def embed_text(text: str, model_name: str = MODEL_NAME) -> list[float]:
     """
     Generate a normalized embedding vector for given text.
-    Returns a Python list of floats (length = 384).
+    Returns a Python list of floats (length = model dimensions, 384 for MiniLM).
+
+    Uses the shared embedder process (`manage.py run_embedder`) when its
+    socket is reachable, otherwise encodes in-process.
+    """
+    global _remote_down_until
+    path = getattr(settings, "EMBEDDER_SOCKET", "")
+    if path and time.monotonic() >= _remote_down_until:
+        try:
+            vector = _embed_remote(text, model_name, path)
+            if vector:
+                return vector
+        except (OSError, struct.error):
+            pass
+        _remote_down_until = time.monotonic() + getattr(settings, "EMBEDDER_RETRY_AFTER", 30.0)
+    return encode_local([text], model_name)[0]
+
+
+def warm_embedder(model_name: str, timeout: float = 600.0) -> bool:
+    """
+    Ask the embedder process to load a model ahead of time (e.g. before a
+    re-embed cutover), so workers never hit its load time and fall back to
+    loading the model themselves. Returns False if the embedder isn't running.
     """
-    embedding = _model.encode(text, normalize_embeddings=True)
-    return embedding.tolist()
+    path = getattr(settings, "EMBEDDER_SOCKET", "")
+    if not path:
+        return False
+    try:
+        return bool(_embed_remote("warmup", model_name, path, timeout))
+    except (OSError, struct.error):
+        return False
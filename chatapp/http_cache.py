@@ -0,0 +1,78 @@
+# chatapp/http_cache.py
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Conversation
+
+
+def _validators(parts, last_modified):
+    # Weak: compressed and uncompressed bodies are the same representation
+    digest = hashlib.md5(":".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest}"', int(last_modified.timestamp()) if last_modified else None
+
+
+def conversation_validators(pk, since=None):
+    """
+    (etag, last_modified) for one conversation from a single aggregate query,
+    or None if it doesn't exist. No messages are loaded or serialised.
+    """
+    try:
+        row = (
+            Conversation.objects.filter(pk=pk)
+            .annotate(
+                last_message_id=Max("messages__id"),
+                last_message_at=Max("messages__timestamp"),
+                message_count=Count("messages"),
+            )
+            .values("id", "status", "updated_at", "last_message_id", "last_message_at", "message_count")
+            .first()
+        )
+    except (ValueError, TypeError):
+        return None
+    if row is None:
+        return None
+
+    last_modified = max(t for t in (row["updated_at"], row["last_message_at"]) if t)
+    return _validators(
+        [row["id"], row["status"], row["updated_at"].isoformat(),
+         row["last_message_id"], row["message_count"], since],
+        last_modified,
+    )
+
+
+def conversation_list_validators(since=None):
+    """(etag, last_modified) covering every conversation and message."""
+    agg = Conversation.objects.aggregate(
+        conversation_count=Count("id", distinct=True),
+        updated_at=Max("updated_at"),
+        last_message_id=Max("messages__id"),
+        last_message_at=Max("messages__timestamp"),
+        message_count=Count("messages"),
+    )
+    times = [t for t in (agg["updated_at"], agg["last_message_at"]) if t]
+    return _validators(
+        [agg["conversation_count"], agg["updated_at"] and agg["updated_at"].isoformat(),
+         agg["last_message_id"], agg["message_count"], since],
+        max(times) if times else None,
+    )
+
+
+def not_modified(request, validators):
+    """A 304 response if the client's copy is still current, else None."""
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        apply_validators(response, validators)
+    return response
+
+
+def apply_validators(response, validators):
+    etag, last_modified = validators
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Always revalidate; otherwise browsers may reuse a stale copy heuristically
+    patch_cache_control(response, no_cache=True)
@@ -1,26 +1,19 @@
 # chatapp/management/commands/backfill_embeddings.py
 from django.core.management.base import BaseCommand
-from django.db import connection
 from chatapp.models import Message
-from chatapp.embeddings import embed_text
+from chatapp.vector_index import active_version, embed_message
 
 class Command(BaseCommand):
     help = "Generate embeddings for all messages that don't have one yet."
 
     def handle(self, *args, **options):
-        messages = Message.objects.filter(embedding__isnull=True)
+        version = active_version()
+        messages = Message.objects.filter(**{f"{version.column}__isnull": True})
         total = messages.count()
-        self.stdout.write(self.style.NOTICE(f"🧠 Backfilling {total} messages..."))
+        self.stdout.write(self.style.NOTICE(f"🧠 Backfilling {total} messages with {version.name}..."))
 
         for i, msg in enumerate(messages, start=1):
-            vector = embed_text(msg.content)
-            vector_literal = "[" + ",".join(str(x) for x in vector) + "]"
-
-            with connection.cursor() as cur:
-                cur.execute(
-                    "UPDATE chatapp_message SET embedding = %s::vector WHERE id = %s",
-                    [vector_literal, msg.id],
-                )
+            embed_message(msg.id, msg.content)
 
             if i % 10 == 0 or i == total:
                 self.stdout.write(self.style.SUCCESS(f"✅ {i}/{total} done"))
@@ -0,0 +1,159 @@
+# chatapp/management/commands/reembed.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from chatapp.embeddings import encode_local, get_model, warm_embedder
+from chatapp.models import EmbeddingVersion, Message
+from chatapp.vector_index import ACTIVE_VERSION_TTL, coverage, store_vectors
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-embed all messages with a new model into the spare vector slot in "
+        "throttled batches, then switch search over once coverage is high enough."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="SentenceTransformer model name to switch to.")
+        parser.add_argument("--dimensions", type=int,
+                            help="Vector size of the new model (detected from the model if omitted).")
+        parser.add_argument("--batch-size", type=int, default=64)
+        parser.add_argument("--sleep", type=float, default=0.5,
+                            help="Seconds to pause between batches to keep load off the database.")
+        parser.add_argument("--threshold", type=float, default=0.99,
+                            help="Fraction of messages that must be re-embedded before cutover.")
+        parser.add_argument("--coverage-every", type=int, default=50,
+                            help="Recount coverage every N batches (and at the end of each pass).")
+
+    def handle(self, *args, **options):
+        version = self._target_version(options["model"], options["dimensions"])
+        self.stdout.write(self.style.NOTICE(f"🧠 Re-embedding into {version.column} with {version.name}..."))
+
+        cutover_at = 0.0
+        last_id = 0
+        batches = 0
+        pass_embedded = 0
+        while True:
+            # Page by primary key so each batch starts where the last one ended
+            embedded, last_id = self._embed_batch(version, last_id, options["batch_size"])
+            pass_embedded += embedded
+            batches += 1
+            pass_done = not embedded
+
+            if version.status == "building" and (pass_done or batches % options["coverage_every"] == 0):
+                covered = coverage(version)
+                self.stdout.write(self.style.SUCCESS(f"✅ {covered:.1%} covered"))
+                if covered >= options["threshold"]:
+                    self._cutover(version)
+                    cutover_at = time.monotonic()
+
+            if pass_done:
+                # Done once a full sweep finds nothing left, and workers that still
+                # cached the old version have stopped writing to the old slot
+                if not pass_embedded and version.status == "active" \
+                        and time.monotonic() - cutover_at > ACTIVE_VERSION_TTL:
+                    break
+                # Sweep again from the start for rows added behind the cursor
+                last_id = 0
+                pass_embedded = 0
+
+            time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"🎯 All messages embedded with {version.name}!"))
+
+    def _target_version(self, name, dimensions):
+        existing = EmbeddingVersion.objects.filter(name=name, status__in=["building", "active"]).first()
+        if existing:
+            return existing
+
+        other = EmbeddingVersion.objects.filter(status="building").first()
+        if other:
+            raise CommandError(f"Re-embedding with {other.name} is already in progress.")
+
+        active = EmbeddingVersion.objects.get(status="active")
+        column = "embedding_next" if active.column == "embedding" else "embedding"
+        dimensions = dimensions or get_model(name).get_sentence_embedding_dimension()
+
+        # Recreating the spare slot is instant and drops its stale vectors and index.
+        # The types must match Message's VectorField(null=True) and
+        # CharField(max_length=200, null=True) exactly, or the table drifts from
+        # what migrations think it is; change them together.
+        # The DDL takes a brief ACCESS EXCLUSIVE lock, and runs in the same
+        # transaction as the version row so a failure leaves neither behind.
+        model_column = f"{column}_model"
+        with transaction.atomic():
+            with connection.cursor() as cur:
+                cur.execute(
+                    f"""
+                    ALTER TABLE chatapp_message
+                        DROP COLUMN IF EXISTS {column},
+                        DROP COLUMN IF EXISTS {model_column},
+                        ADD COLUMN {column} vector NULL,
+                        ADD COLUMN {model_column} varchar(200) NULL;
+                    """
+                )
+            EmbeddingVersion.objects.filter(column=column).update(status="retired")
+            return EmbeddingVersion.objects.create(name=name, dimensions=dimensions, column=column)
+
+    def _embed_batch(self, version, last_id, batch_size):
+        """Embed the next batch after `last_id`; returns (count, new last_id)."""
+        rows = list(
+            Message.objects.filter(id__gt=last_id, **{f"{version.column}__isnull": True})
+            .order_by("id")
+            .values_list("id", "content")[:batch_size]
+        )
+        if not rows:
+            return 0, last_id
+
+        vectors = encode_local([content for _, content in rows], version.name)
+        store_vectors([(message_id, vector) for (message_id, _), vector in zip(rows, vectors)], version)
+        return len(rows), rows[-1][0]
+
+    def _cutover(self, version):
+        # Workers start asking the embedder for this model right after the flip
+        if warm_embedder(version.name):
+            self.stdout.write(self.style.SUCCESS(f"✅ Embedder has {version.name} loaded"))
+
+        self._build_index(version)
+
+        with transaction.atomic():
+            EmbeddingVersion.objects.filter(status="active").update(status="retired")
+            version.status = "active"
+            version.activated_at = timezone.now()
+            version.save(update_fields=["status", "activated_at"])
+
+        self.stdout.write(self.style.SUCCESS(f"🔀 Search now reads {version.name}"))
+
+    def _index_valid(self, index_name):
+        """True/False from pg_index.indisvalid, or None if the index doesn't exist."""
+        with connection.cursor() as cur:
+            cur.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", [index_name])
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def _build_index(self, version):
+        valid = self._index_valid(version.index_name)
+        with connection.cursor() as cur:
+            # An interrupted CONCURRENTLY build leaves an INVALID index behind that
+            # IF NOT EXISTS would happily skip; drop it and build again
+            if valid is False:
+                self.stdout.write(self.style.WARNING(f"⚠️ Dropping invalid {version.index_name}"))
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {version.index_name};")
+            if valid is not True:
+                self.stdout.write(self.style.NOTICE(f"🔧 Building {version.index_name}..."))
+                cur.execute(
+                    f"""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS {version.index_name}
+                    ON chatapp_message
+                    USING hnsw (({version.column}::vector({version.dimensions})) vector_cosine_ops);
+                    """
+                )
+
+        if self._index_valid(version.index_name) is not True:
+            raise CommandError(
+                f"{version.index_name} is not valid; search stays on the current version. "
+                "Re-run the command to rebuild it."
+            )
@@ -0,0 +1,46 @@
+# chatapp/management/commands/run_embedder.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from chatapp.embed_server import EmbeddingServer
+from chatapp.vector_index import active_version
+
+
+class Command(BaseCommand):
+    help = "Run the shared embedding process that serves all web workers over a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.EMBEDDER_SOCKET,
+                            help="Unix socket path (defaults to settings.EMBEDDER_SOCKET).")
+        parser.add_argument("--max-batch", type=int, default=32,
+                            help="Maximum number of texts encoded in one forward pass.")
+        parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                            help="How long to wait for more texts before encoding a partial batch.")
+
+    def handle(self, *args, **options):
+        path = options["socket"]
+        if not path:
+            raise CommandError("No socket path set. Pass --socket or set EMBEDDER_SOCKET.")
+
+        try:
+            server = EmbeddingServer(
+                path,
+                max_batch=options["max_batch"],
+                max_wait=options["max_wait_ms"] / 1000,
+            )
+        except OSError as e:
+            raise CommandError(f"Can't listen on {path}: {e}")
+
+        # Other models (e.g. one being re-embedded) are loaded on first request
+        model_name = active_version().name
+        self.stdout.write(self.style.NOTICE(f"🧠 Loading {model_name}..."))
+        server.batcher_for(model_name)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Embedder listening on {path}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(self.style.SUCCESS("👋 Embedder stopped"))
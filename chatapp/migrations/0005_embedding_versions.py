@@ -0,0 +1,87 @@
+import pgvector.django.vector
+from django.db import migrations, models
+
+MINILM = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def seed_active_version(apps, schema_editor):
+    EmbeddingVersion = apps.get_model('chatapp', 'EmbeddingVersion')
+    Message = apps.get_model('chatapp', 'Message')
+    EmbeddingVersion.objects.create(
+        name=MINILM, dimensions=384, column='embedding', status='active',
+    )
+    Message.objects.filter(embedding__isnull=False).update(embedding_model=MINILM)
+
+
+def unseed_active_version(apps, schema_editor):
+    apps.get_model('chatapp', 'EmbeddingVersion').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0004_remove_conversation_embedding'),
+    ]
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    operations = [
+        # 1) The HNSW index depends on the column's VECTOR(384) type, so drop it
+        #    before making the column dimension-agnostic
+        migrations.RunSQL(
+            "DROP INDEX CONCURRENTLY IF EXISTS chatapp_message_embedding_hnsw;",
+            reverse_sql="""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS chatapp_message_embedding_hnsw
+            ON chatapp_message
+            USING hnsw (embedding vector_cosine_ops);
+            """,
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='embedding',
+            field=pgvector.django.vector.VectorField(null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='embedding_model',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='embedding_next',
+            field=pgvector.django.vector.VectorField(null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='embedding_next_model',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.CreateModel(
+            name='EmbeddingVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('dimensions', models.PositiveIntegerField()),
+                ('column', models.CharField(choices=[('embedding', 'embedding'), ('embedding_next', 'embedding_next')], max_length=20)),
+                ('status', models.CharField(choices=[('building', 'Building'), ('active', 'Active'), ('retired', 'Retired')], default='building', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('status',), name='one_active_embedding_version')],
+            },
+        ),
+        migrations.RunPython(seed_active_version, unseed_active_version),
+
+        # 2) Recreate the index as an expression index on the version's dimensions;
+        #    search casts to the same type so the planner can use it
+        migrations.RunSQL(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS chatapp_message_embedding_hnsw
+            ON chatapp_message
+            USING hnsw ((embedding::vector(384)) vector_cosine_ops);
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS chatapp_message_embedding_hnsw;",
+        ),
+    ]
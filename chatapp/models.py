@@ -19,6 +19,8 @@ class Conversation(models.Model):
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(null=True, blank=True)
     summary = models.TextField(null=True, blank=True)
+    # Bumped on every save (rename, end); used for ETag/Last-Modified
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
        return f"Conversation {self.id} - {self.title or 'Untitled'}"
@@ -34,7 +36,57 @@ class Message(models.Model):
     sender = models.CharField(max_length=10, choices=SENDER_CHOICES)
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
-    embedding = VectorField(dimensions=384, null=True)
+
+    # Two vector slots so a new embedding model can be filled in the background
+    # while search keeps reading the other one (see EmbeddingVersion).
+    # Dimensions live on the version; indexes cast to them.
+    embedding = VectorField(null=True)
+    embedding_model = models.CharField(max_length=200, null=True, blank=True)
+    embedding_next = VectorField(null=True)
+    embedding_next_model = models.CharField(max_length=200, null=True, blank=True)
 
     def __str__(self):
         return f"{self.sender}: {self.content[:40]}..."
+
+
+class EmbeddingVersion(models.Model):
+    """An embedding model and the Message vector slot holding its vectors."""
+
+    COLUMN_CHOICES = [
+        ('embedding', 'embedding'),
+        ('embedding_next', 'embedding_next'),
+    ]
+
+    STATUS_CHOICES = [
+        ('building', 'Building'),
+        ('active', 'Active'),
+        ('retired', 'Retired'),
+    ]
+
+    name = models.CharField(max_length=200)
+    dimensions = models.PositiveIntegerField()
+    column = models.CharField(max_length=20, choices=COLUMN_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='building')
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Search reads exactly one version; cutover swaps it in one transaction
+            models.UniqueConstraint(
+                fields=['status'],
+                condition=models.Q(status='active'),
+                name='one_active_embedding_version',
+            ),
+        ]
+
+    @property
+    def model_column(self):
+        return f"{self.column}_model"
+
+    @property
+    def index_name(self):
+        return f"chatapp_message_{self.column}_hnsw"
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, {self.column})"
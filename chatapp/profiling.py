@@ -0,0 +1,179 @@
+# chatapp/profiling.py
+import cProfile
+import hmac
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+# Stage timings for the request being profiled; None when not profiling
+_stages = ContextVar("profile_stages", default=None)
+
+# cProfile hooks are process-wide (sys.monitoring on 3.12+): only one request
+# at a time can use it, and concurrent requests skip profiling instead
+_cprofile_lock = threading.Lock()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block of a view (e.g. embedding, LLM call) when the request is profiled."""
+    stages = _stages.get()
+    if stages is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + (time.perf_counter() - started)
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack on a timer and aggregates it in the
+    folded format understood by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path: Path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingMiddleware:
+    """
+    Profiles individual views on demand: requests carrying a matching
+    `X-Profile` header, plus a random `PROFILE_SAMPLE_RATE` share of traffic.
+    Writes a flamegraph-compatible profile and a JSON file with the endpoint,
+    conversation id and stage timings to `PROFILE_DIR`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        profile = getattr(request, "_profile", None)
+        if profile is not None:
+            self._finish(request, response, profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self._wanted(request):
+            return None
+
+        mode = settings.PROFILE_MODE
+        if mode == "cprofile":
+            if not _cprofile_lock.acquire(blocking=False):
+                return None
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler or debugger owns the hooks
+                _cprofile_lock.release()
+                return None
+        else:
+            profiler = StackSampler(threading.get_ident(), settings.PROFILE_INTERVAL)
+            profiler.start()
+
+        request._profile = {
+            "mode": mode,
+            "profiler": profiler,
+            "stages": {},
+            "started": time.perf_counter(),
+            "endpoint": request.resolver_match.view_name or view_func.__name__,
+            "conversation": view_kwargs.get("pk") or request.GET.get("conversation"),
+        }
+        request._profile["token"] = _stages.set(request._profile["stages"])
+        return None
+
+    def _wanted(self, request) -> bool:
+        token = settings.PROFILE_TOKEN
+        header = request.headers.get("X-Profile")
+        # Compare bytes: compare_digest rejects non-ASCII str
+        if token and header and hmac.compare_digest(header.encode(), token.encode()):
+            return True
+        rate = settings.PROFILE_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def _finish(self, request, response, profile):
+        profiler = profile["profiler"]
+        try:
+            if profile["mode"] == "cprofile":
+                profiler.disable()
+            else:
+                profiler.stop()
+        finally:
+            if profile["mode"] == "cprofile":
+                _cprofile_lock.release()
+            _stages.reset(profile["token"])
+        duration = time.perf_counter() - profile["started"]
+
+        # Never turn a good response into a 500 because a profile couldn't be written
+        try:
+            self._write(request, response, profile, duration)
+        except Exception as e:
+            print("⚠️ Failed to write profile:", e)
+
+    def _write(self, request, response, profile, duration):
+        profiler = profile["profiler"]
+        out_dir = Path(settings.PROFILE_DIR)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        name = "{}-{}-{}-{}".format(
+            time.strftime("%Y%m%d-%H%M%S"),
+            profile["endpoint"].replace(":", "_").replace("/", "_"),
+            profile["conversation"] or "none",
+            uuid.uuid4().hex[:8],
+        )
+
+        if profile["mode"] == "cprofile":
+            profiler.dump_stats(out_dir / f"{name}.prof")
+        else:
+            profiler.dump(out_dir / f"{name}.folded")
+
+        meta = {
+            "endpoint": profile["endpoint"],
+            "method": request.method,
+            "path": request.path,
+            "conversation": profile["conversation"],
+            "status": response.status_code,
+            "duration": round(duration, 6),
+            "stages": {k: round(v, 6) for k, v in profile["stages"].items()},
+            "mode": profile["mode"],
+        }
+        with open(out_dir / f"{name}.json", "w") as f:
+            json.dump(meta, f, indent=2)
@@ -1,3 +1,262 @@
-from django.test import TestCase
+import gzip
+import socket
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from unittest import skipUnless
 
-# Create your tests here.
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.test import APIRequestFactory
+
+from . import compression
+from .admission import BACKGROUND, INTERACTIVE, SUMMARY, AdmissionController, Rejected
+from .compression import CompressionMiddleware
+from .embeddings import pack_text, pack_vector, read_text, read_vector
+from .http_cache import _validators, apply_validators, not_modified
+from .views import ConversationViewSet
+
+
+def _wait_until(predicate, timeout=2.0):
+    expires = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > expires:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.005)
+
+
+class AdmissionControllerTests(SimpleTestCase):
+
+    def _queue_in_background(self, controller, priority, deadline, results, name):
+        def run():
+            try:
+                with controller.slot(priority, deadline):
+                    results.append(name)
+            except Rejected as e:
+                results.append((name, e.reason))
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_higher_priority_is_served_first(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=5, initial_service_time=0.01)
+        controller.acquire(INTERACTIVE, 5)
+
+        results = []
+        threads = [
+            self._queue_in_background(controller, BACKGROUND, 5, results, "background"),
+        ]
+        _wait_until(lambda: controller.snapshot()["queued"] == 1)
+        threads.append(self._queue_in_background(controller, SUMMARY, 5, results, "summary"))
+        _wait_until(lambda: controller.snapshot()["queued"] == 2)
+        threads.append(self._queue_in_background(controller, INTERACTIVE, 5, results, "interactive"))
+        _wait_until(lambda: controller.snapshot()["queued"] == 3)
+
+        controller.release(0.01)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["interactive", "summary", "background"])
+
+    def test_full_queue_is_rejected_with_503(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=1, initial_service_time=0.01)
+        controller.acquire(INTERACTIVE, 5)
+        results = []
+        thread = self._queue_in_background(controller, INTERACTIVE, 5, results, "queued")
+        _wait_until(lambda: controller.snapshot()["queued"] == 1)
+
+        with self.assertRaises(Rejected) as ctx:
+            controller.check(INTERACTIVE, 5)
+        self.assertEqual(ctx.exception.status, 503)
+        self.assertEqual(ctx.exception.reason, "queue_full")
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        controller.release(0.01)
+        thread.join()
+        self.assertEqual(results, ["queued"])
+
+    def test_full_queue_evicts_lower_priority_waiter(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=1, initial_service_time=0.01)
+        controller.acquire(INTERACTIVE, 5)
+        results = []
+        background = self._queue_in_background(controller, BACKGROUND, 5, results, "background")
+        _wait_until(lambda: controller.snapshot()["queued"] == 1)
+
+        # The up-front check lets the interactive turn through...
+        controller.check(INTERACTIVE, 5)
+        # ...and queueing it turns the background job away instead
+        interactive = self._queue_in_background(controller, INTERACTIVE, 5, results, "interactive")
+        background.join()
+        self.assertEqual(results, [("background", "queue_full")])
+
+        controller.release(0.01)
+        interactive.join()
+        self.assertEqual(results, [("background", "queue_full"), "interactive"])
+        snapshot = controller.snapshot()
+        self.assertEqual(snapshot["priorities"]["background"]["rejected"]["queue_full"], 1)
+        self.assertEqual(snapshot["priorities"]["interactive"]["rejected"]["queue_full"], 0)
+
+    def test_predicted_wait_over_deadline_is_rejected_with_429(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=5, initial_service_time=10)
+        controller.acquire(INTERACTIVE, 5)
+
+        with self.assertRaises(Rejected) as ctx:
+            controller.acquire(INTERACTIVE, 1)
+        self.assertEqual(ctx.exception.status, 429)
+        self.assertEqual(ctx.exception.reason, "deadline")
+        self.assertEqual(ctx.exception.retry_after, 10)
+        self.assertEqual(controller.snapshot()["queued"], 0)
+
+    def test_deadline_expiry_removes_waiter_from_queue(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=5, initial_service_time=0.01)
+        controller.acquire(INTERACTIVE, 5)
+
+        with self.assertRaises(Rejected) as ctx:
+            controller.acquire(SUMMARY, 0.05)
+        self.assertEqual(ctx.exception.status, 503)
+        self.assertEqual(ctx.exception.reason, "timeout")
+        self.assertEqual(controller.snapshot()["queued"], 0)
+
+        # The slot frees up normally once the holder releases it
+        controller.release(0.01)
+        with controller.slot(INTERACTIVE, 1):
+            self.assertEqual(controller.snapshot()["active"], 1)
+
+    def test_snapshot_counts_admissions_and_rejections(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=5, initial_service_time=10)
+        with controller.slot(INTERACTIVE, 1):
+            with self.assertRaises(Rejected):
+                controller.check(SUMMARY, 1)
+
+        snapshot = controller.snapshot()
+        self.assertEqual(snapshot["active"], 0)
+        self.assertEqual(snapshot["priorities"]["interactive"]["admitted"], 1)
+        self.assertEqual(snapshot["priorities"]["summary"]["rejected"]["deadline"], 1)
+        self.assertEqual(snapshot["priorities"]["background"]["admitted"], 0)
+        self.assertLess(snapshot["service_time_estimate"], 10)
+
+
+@override_settings(COMPRESS_MIN_LENGTH=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    payload = {"messages": ["hello there"] * 50}
+
+    def _respond(self, response, accept="gzip, br"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda r: response)(request)
+
+    def test_gzip_when_brotli_is_not_accepted(self):
+        original = JsonResponse(self.payload).content
+        response = self._respond(JsonResponse(self.payload), accept="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), original)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    @skipUnless(compression.brotli, "brotli not installed")
+    def test_brotli_preferred_when_accepted(self):
+        original = JsonResponse(self.payload).content
+        response = self._respond(JsonResponse(self.payload))
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(compression.brotli.decompress(response.content), original)
+
+    def test_no_encoding_accepted_leaves_body_alone(self):
+        response = self._respond(JsonResponse(self.payload), accept="identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_small_and_non_json_responses_are_not_compressed(self):
+        small = self._respond(JsonResponse({"ok": True}))
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertFalse(small.has_header("Vary"))
+
+        html = self._respond(HttpResponse("<p>hi</p>" * 100, content_type="text/html"))
+        self.assertFalse(html.has_header("Content-Encoding"))
+
+    def test_strong_etag_is_weakened_and_weak_etag_kept(self):
+        strong = JsonResponse(self.payload)
+        strong["ETag"] = '"abc"'
+        self.assertEqual(self._respond(strong, accept="gzip")["ETag"], 'W/"abc"')
+
+        weak = JsonResponse(self.payload)
+        weak["ETag"] = 'W/"abc"'
+        self.assertEqual(self._respond(weak, accept="gzip")["ETag"], 'W/"abc"')
+
+
+class ConditionalGetTests(SimpleTestCase):
+    modified = datetime(2025, 11, 6, 12, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.validators = _validators([1, "active", 42, 7, None], self.modified)
+
+    def test_matching_etag_gets_304_with_validators(self):
+        etag, _ = self.validators
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag)
+        response = not_modified(request, self.validators)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response["Last-Modified"], http_date(self.modified.timestamp()))
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_unmodified_since_gets_304(self):
+        request = RequestFactory().get("/", HTTP_IF_MODIFIED_SINCE=http_date(self.modified.timestamp()))
+        self.assertEqual(not_modified(request, self.validators).status_code, 304)
+
+    def test_changed_conversation_is_served(self):
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=self.validators[0])
+        changed = _validators([1, "active", 43, 8, None], self.modified)
+        self.assertIsNone(not_modified(request, changed))
+
+    def test_etag_depends_on_since_message_id(self):
+        self.assertNotEqual(
+            _validators([1, "active", 42, 7, None], self.modified)[0],
+            _validators([1, "active", 42, 7, 40], self.modified)[0],
+        )
+
+    def test_apply_validators_sets_headers(self):
+        response = HttpResponse()
+        apply_validators(response, self.validators)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        self.assertEqual(response["Last-Modified"], http_date(self.modified.timestamp()))
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_non_integer_since_message_id_is_rejected(self):
+        view = ConversationViewSet.as_view({"get": "list"})
+        response = view(APIRequestFactory().get("/api/conversations/", {"since_message_id": "abc"}))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("since_message_id", response.data)
+
+
+class EmbedderProtocolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client_sock, self.server_sock = socket.socketpair()
+        self.addCleanup(self.client_sock.close)
+        self.addCleanup(self.server_sock.close)
+
+    def test_text_round_trip_including_non_ascii(self):
+        texts = ["hello", "héllo wörld ✓ 你好", ""]
+        self.client_sock.sendall(b"".join(pack_text(t) for t in texts))
+        self.assertEqual([read_text(self.server_sock) for _ in texts], texts)
+
+    def test_vector_round_trip(self):
+        vector = [0.5, -1.25, 0.0, 3.0]
+        self.server_sock.sendall(pack_vector(vector))
+        self.assertEqual(read_vector(self.client_sock), vector)
+
+    def test_empty_vector_is_the_error_frame(self):
+        self.server_sock.sendall(pack_vector([]))
+        self.assertEqual(read_vector(self.client_sock), [])
+
+    def test_early_close_raises_connection_error(self):
+        frame = pack_text("truncated")
+        self.client_sock.sendall(frame[:-3])
+        self.client_sock.close()
+        with self.assertRaises(ConnectionError):
+            read_text(self.server_sock)
+
+    def test_close_before_header_raises_connection_error(self):
+        self.server_sock.close()
+        with self.assertRaises(ConnectionError):
+            read_vector(self.client_sock)
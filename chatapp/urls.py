@@ -2,7 +2,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import ConversationViewSet, search_messages
-from .views import recall_context
+from .views import recall_context, admission_metrics
 
 router = DefaultRouter()
 router.register(r'conversations', ConversationViewSet, basename='conversation')
@@ -11,4 +11,5 @@ urlpatterns = [
     path('', include(router.urls)),
     path('search/', search_messages, name='semantic-search'),
      path("recall/", recall_context, name="recall-context"),
+    path("metrics/admission/", admission_metrics, name="admission-metrics"),
 ]
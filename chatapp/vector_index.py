@@ -0,0 +1,61 @@
+# chatapp/vector_index.py
+import time
+
+from django.db import connection
+
+from .embeddings import MODEL_NAME, embed_text
+from .models import EmbeddingVersion
+
+# How long a worker trusts its cached active version before re-reading it.
+# Cutover is a single transaction; workers pick it up within this window.
+ACTIVE_VERSION_TTL = 10.0
+
+_active = None
+_active_read_at = 0.0
+
+
+def active_version() -> EmbeddingVersion:
+    """The embedding version search reads from, cached per process."""
+    global _active, _active_read_at
+    now = time.monotonic()
+    if _active is None or now - _active_read_at > ACTIVE_VERSION_TTL:
+        _active = (
+            EmbeddingVersion.objects.filter(status="active").first()
+            or EmbeddingVersion(name=MODEL_NAME, dimensions=384, column="embedding", status="active")
+        )
+        _active_read_at = now
+    return _active
+
+
+def vector_literal(vector) -> str:
+    return "[" + ",".join(str(x) for x in vector) + "]"
+
+
+def distance_sql(version: EmbeddingVersion) -> str:
+    """Cosine distance expression matching the slot's HNSW expression index."""
+    return f"({version.column}::vector({version.dimensions}) <=> %s::vector({version.dimensions}))"
+
+
+def store_vectors(rows, version: EmbeddingVersion):
+    """Write (message_id, vector) pairs into the version's slot."""
+    with connection.cursor() as cur:
+        cur.executemany(
+            f"UPDATE chatapp_message SET {version.column} = %s::vector, {version.model_column} = %s WHERE id = %s",
+            [(vector_literal(vector), version.name, message_id) for message_id, vector in rows],
+        )
+
+
+def embed_message(message_id: int, text: str):
+    """Embed a message with the active model and store it in the active slot."""
+    version = active_version()
+    vector = embed_text(text, version.name)
+    if vector:
+        store_vectors([(message_id, vector)], version)
+
+
+def coverage(version: EmbeddingVersion) -> float:
+    """Fraction of messages that already have a vector in this version's slot."""
+    with connection.cursor() as cur:
+        cur.execute(f"SELECT count(*), count({version.column}) FROM chatapp_message")
+        total, filled = cur.fetchone()
+    return filled / total if total else 1.0
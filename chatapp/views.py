@@ -1,21 +1,34 @@
 # FILE: chatapp/views.py
+import time
+
 from django.db import connection
+from django.db.models import Prefetch
 from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from pgvector.django import L2Distance
-from sentence_transformers import SentenceTransformer
 import requests
 
 from .models import Conversation, Message
 from .serializers import ConversationSerializer, MessageSerializer
 from .ai_utils import generate_summary
 from .embeddings import embed_text
+from .http_cache import apply_validators, conversation_list_validators, conversation_validators, not_modified
+from .profiling import stage
+from .vector_index import active_version, distance_sql, embed_message, vector_literal
+from . import admission
+from .admission import INTERACTIVE, SUMMARY, Rejected, llm_timeout, request_deadline
 
 
-# 🧠 Load embedding model globally (efficient reuse)
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+def _overloaded(exc):
+    """Fast rejection telling the client when to try again."""
+    return Response(
+        {"error": "LLM is busy, please retry shortly.", "reason": exc.reason},
+        status=exc.status,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 # ==========================================
@@ -32,6 +45,45 @@ class ConversationViewSet(viewsets.ModelViewSet):
     queryset = Conversation.objects.all().order_by("-start_time")
     serializer_class = ConversationSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            # Load messages in one query; ?since_message_id= returns only newer ones
+            messages = Message.objects.order_by("id")
+            since = self._since_message_id()
+            if since is not None:
+                messages = messages.filter(id__gt=since)
+            queryset = queryset.prefetch_related(Prefetch("messages", queryset=messages))
+        return queryset
+
+    def _since_message_id(self):
+        since = self.request.query_params.get("since_message_id")
+        if since is None:
+            return None
+        try:
+            return int(since)
+        except ValueError:
+            raise ValidationError({"since_message_id": "Must be an integer."})
+
+    # 📦 Conditional GETs: 304 before any messages are loaded or serialised
+    def list(self, request, *args, **kwargs):
+        validators = conversation_list_validators(self._since_message_id())
+        response = not_modified(request, validators)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            apply_validators(response, validators)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = conversation_validators(kwargs["pk"], self._since_message_id())
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)
+        response = not_modified(request, validators)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+            apply_validators(response, validators)
+        return response
+
     # 💬 Add message + AI reply
     @action(detail=True, methods=["post"])
     def add_message(self, request, pk=None):
@@ -42,6 +94,14 @@ class ConversationViewSet(viewsets.ModelViewSet):
         if not user_msg:
             return Response({"error": "Message content required."}, status=400)
 
+        # Turn away up front, before anything is saved, if the LLM is saturated
+        deadline = request_deadline(request, INTERACTIVE)
+        expires = time.monotonic() + deadline
+        try:
+            admission.controller.check(INTERACTIVE, deadline)
+        except Rejected as e:
+            return _overloaded(e)
+
         # 1️⃣ Save user message
         msg = Message.objects.create(
             conversation=conversation,
@@ -51,14 +111,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
 
         # 2️⃣ Generate and store embedding
         try:
-            vector = embed_text(user_msg)
-            if vector:
-                vec_literal = "[" + ",".join(str(x) for x in vector) + "]"
-                with connection.cursor() as cur:
-                    cur.execute(
-                        "UPDATE chatapp_message SET embedding = %s::vector WHERE id = %s",
-                        [vec_literal, msg.id],
-                    )
+            with stage("embed_user"):
+                embed_message(msg.id, user_msg)
         except Exception as e:
             print("❌ Embedding generation failed:", e)
 
@@ -66,7 +120,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
         recalled_context = ""
         try:
             recall_url = f"http://127.0.0.1:8000/api/recall/?q={user_msg}&conversation={conversation.id}"
-            recall_res = requests.get(recall_url)
+            with stage("recall"):
+                recall_res = requests.get(recall_url)
             if recall_res.status_code == 200:
                 recall_data = recall_res.json()
                 recalled_context = "\n".join(
@@ -99,10 +154,20 @@ class ConversationViewSet(viewsets.ModelViewSet):
             "max_tokens": 250,
         }
 
-        # 5️⃣ Generate AI response from LM Studio
+        # 5️⃣ Generate AI response from LM Studio (only this holds an LLM slot)
         try:
-            ai_response = requests.post("http://localhost:1234/v1/chat/completions", json=payload).json()
+            remaining = max(0.0, expires - time.monotonic())
+            with admission.controller.slot(INTERACTIVE, remaining), stage("llm"):
+                ai_response = requests.post(
+                    "http://localhost:1234/v1/chat/completions",
+                    json=payload,
+                    timeout=llm_timeout(expires),
+                ).json()
             ai_text = ai_response["choices"][0]["message"]["content"]
+        except Rejected as e:
+            # Roll the turn back so a retry doesn't duplicate the user message
+            msg.delete()
+            return _overloaded(e)
         except Exception as e:
             ai_text = f"AI generation failed: {e}"
 
@@ -115,14 +180,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
 
         # Optional: generate embedding for AI message too
         try:
-            ai_vec = embed_text(ai_text)
-            if ai_vec:
-                vec_literal = "[" + ",".join(str(x) for x in ai_vec) + "]"
-                with connection.cursor() as cur:
-                    cur.execute(
-                        "UPDATE chatapp_message SET embedding = %s::vector WHERE id = %s",
-                        [vec_literal, ai_msg.id],
-                    )
+            with stage("embed_ai"):
+                embed_message(ai_msg.id, ai_text)
         except Exception as e:
             print("⚠️ Failed to store AI embedding:", e)
 
@@ -131,6 +190,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 "user_message": msg.content,
                 "ai_response": ai_text,
                 "context_used": recalled_context,
+                # Saved copies (with ids) so clients can replace optimistic entries
+                "messages": MessageSerializer([msg, ai_msg], many=True).data,
             },
             status=201,
         )
@@ -139,11 +200,19 @@ class ConversationViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def end(self, request, pk=None):
         conversation = self.get_object()
+        msgs = list(conversation.messages.values("sender", "content"))
+
+        deadline = request_deadline(request, SUMMARY)
+        expires = time.monotonic() + deadline
+        try:
+            with admission.controller.slot(SUMMARY, deadline):
+                with stage("summary"):
+                    summary = generate_summary(msgs, timeout=llm_timeout(expires))
+        except Rejected as e:
+            return _overloaded(e)
+
         conversation.status = "ended"
         conversation.end_time = timezone.now()
-
-        msgs = list(conversation.messages.values("sender", "content"))
-        summary = generate_summary(msgs)
         conversation.summary = summary
         conversation.save()
 
@@ -160,20 +229,22 @@ def search_messages(request):
     if not q:
         return Response({"detail": "Missing ?q="}, status=400)
 
-    q_vec = embed_text(q)
-    vec_literal = "[" + ",".join(str(x) for x in q_vec) + "]"
+    version = active_version()
+    with stage("embed_query"):
+        vec_literal = vector_literal(embed_text(q, version.name))
+    distance = distance_sql(version)
 
-    sql = """
+    sql = f"""
         SELECT id, conversation_id, sender, content,
-               1 - (embedding <=> %s::vector) AS similarity
+               1 - {distance} AS similarity
         FROM chatapp_message
-        WHERE embedding IS NOT NULL
-        ORDER BY embedding <=> %s::vector
+        WHERE {version.column} IS NOT NULL
+        ORDER BY {distance}
         LIMIT 10;
     """
 
     rows = []
-    with connection.cursor() as cur:
+    with stage("vector_search"), connection.cursor() as cur:
         cur.execute(sql, [vec_literal, vec_literal])
         for r in cur.fetchall():
             rows.append(
@@ -201,23 +272,25 @@ def recall_context(request):
     if not q:
         return Response({"detail": "Missing ?q="}, status=400)
 
-    q_vec = embed_text(q)
-    vec_literal = "[" + ",".join(str(x) for x in q_vec) + "]"
+    version = active_version()
+    with stage("embed_query"):
+        vec_literal = vector_literal(embed_text(q, version.name))
+    distance = distance_sql(version)
 
     sql = f"""
         SELECT id, conversation_id, sender, content,
-               1 - (embedding <=> %s::vector) AS similarity
+               1 - {distance} AS similarity
         FROM chatapp_message
-        WHERE embedding IS NOT NULL
+        WHERE {version.column} IS NOT NULL
         {'AND conversation_id = %s' if conv_id else ''}
-        ORDER BY embedding <=> %s::vector
+        ORDER BY {distance}
         LIMIT 5;
     """
 
     params = [vec_literal, conv_id, vec_literal] if conv_id else [vec_literal, vec_literal]
 
     results = []
-    with connection.cursor() as cur:
+    with stage("vector_search"), connection.cursor() as cur:
         cur.execute(sql, params)
         for row in cur.fetchall():
             results.append(
@@ -237,3 +310,12 @@ def recall_context(request):
             "matches": results,
         }
     )
+
+
+# ==========================================
+# 📊 Admission Metrics
+# ==========================================
+@api_view(["GET"])
+def admission_metrics(request):
+    """Queue depth, wait times and rejection counts for LLM-bound work"""
+    return Response(admission.controller.snapshot())
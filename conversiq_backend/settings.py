@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'chatapp.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +55,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
+    'chatapp.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'conversiq_backend.urls'
@@ -132,3 +134,44 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Shared embedding process (`python manage.py run_embedder`).
+# Workers send texts over this Unix socket and fall back to in-process
+# encoding when it isn't running. Set to an empty string to disable.
+# The socket is owner-only (0600), so the embedder and web workers must run as
+# the same user; keep it in a directory the app owns rather than /tmp.
+EMBEDDER_SOCKET = os.getenv('EMBEDDER_SOCKET', str(BASE_DIR / 'run' / 'embedder.sock'))
+EMBEDDER_TIMEOUT = float(os.getenv('EMBEDDER_TIMEOUT', '5'))
+# After a failed or timed-out call, encode in-process for this many seconds
+# before trying the embedder again
+EMBEDDER_RETRY_AFTER = float(os.getenv('EMBEDDER_RETRY_AFTER', '30'))
+
+# Admission control for LLM-bound work (chat turns, summaries, background jobs).
+# Requests whose predicted queue wait exceeds their deadline get a 429/503 with
+# Retry-After instead of hanging; the deadline also caps the LM Studio call.
+# The queue lives in each worker process, so LM Studio can see up to
+# LLM_MAX_CONCURRENCY x <number of workers> requests at once.
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '2'))
+LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '16'))
+# Upper bound on a single LM Studio call once admitted (further cut short by
+# the request's deadline), so a hung server can't hold a slot forever
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '60'))
+LLM_DEADLINES = {
+    'interactive': float(os.getenv('LLM_DEADLINE_INTERACTIVE', '30')),
+    'summary': float(os.getenv('LLM_DEADLINE_SUMMARY', '60')),
+    'background': float(os.getenv('LLM_DEADLINE_BACKGROUND', '300')),
+}
+
+# On-demand request profiling. A request is profiled when it sends
+# `X-Profile: <PROFILE_TOKEN>` or is picked by PROFILE_SAMPLE_RATE (0-1).
+# PROFILE_MODE is 'sample' (folded stacks for flamegraphs) or 'cprofile'.
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'sample')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+# JSON responses at least this large are brotli/gzip compressed
+# (brotli needs the optional `brotli` package).
+COMPRESS_MIN_LENGTH = int(os.getenv('COMPRESS_MIN_LENGTH', '1024'))
@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import {
   ChatBubbleLeftRightIcon,
   PlusCircleIcon,
@@ -10,6 +10,7 @@ import {
 import {
   createConversation,
   getAllConversations,
+  getConversation,
   addMessage,
   endConversation,
 } from "./services/api.js";
@@ -23,6 +24,14 @@ export default function App() {
   const [editingId, setEditingId] = useState(null);
   const [editTitle, setEditTitle] = useState("");
 
+  // Messages already loaded per conversation, so reopening a chat only
+  // fetches what's new (?since_message_id=)
+  const messageCache = useRef({});
+
+  useEffect(() => {
+    if (activeConversation) messageCache.current[activeConversation.id] = messages;
+  }, [activeConversation, messages]);
+
   // Load all chats initially
   useEffect(() => {
     loadConversations();
@@ -39,10 +48,12 @@ export default function App() {
 
   // Load messages for one chat
   const loadMessages = async (id) => {
-    const res = await fetch(`http://127.0.0.1:8000/api/conversations/${id}/`);
-    const data = await res.json();
-    setMessages(data.messages || []);
-    setActiveConversation(data);
+    const cached = messageCache.current[id] || [];
+    const lastId = Math.max(0, ...cached.filter((m) => m.id).map((m) => m.id));
+    const res = await getConversation(id, lastId || undefined);
+    const newer = res.data.messages || [];
+    setMessages(lastId ? [...cached, ...newer] : newer);
+    setActiveConversation(res.data);
   };
 
   // Stop AI typing simulation
@@ -105,6 +116,7 @@ export default function App() {
     });
 
     setConversations((prev) => prev.filter((conv) => conv.id !== id));
+    delete messageCache.current[id];
 
     if (activeConversation?.id === id) {
       setActiveConversation(null);
@@ -116,7 +128,8 @@ export default function App() {
   const sendMessage = async () => {
     if (!input.trim() || !activeConversation || loading) return;
 
-    const userMsg = { sender: "user", content: input };
+    // Pending until the server returns the saved copy
+    const userMsg = { sender: "user", content: input, pending: true };
     setMessages((prev) => [...prev, userMsg]);
     setInput("");
     setLoading(true);
@@ -127,14 +140,20 @@ export default function App() {
 
       console.log("🧠 Recall context used:", context_used);
 
+      // Swap the pending entry for the saved messages; leave local notices alone
+      const [savedUser, savedAi] = res.data.messages || [];
       setMessages((prev) => [
-        ...prev,
-        { sender: "ai", content: ai_response || "No response." },
+        ...prev.map((m) =>
+          m === userMsg ? savedUser || { sender: "user", content: m.content } : m
+        ),
+        savedAi || { sender: "ai", content: ai_response || "No response." },
       ]);
     } catch (e) {
       console.error("Send failed:", e);
       setMessages((prev) => [
-        ...prev,
+        ...prev.map((m) =>
+          m === userMsg ? { sender: "user", content: m.content } : m
+        ),
         { sender: "ai", content: "⚠️ Error: " + e.message },
       ]);
     } finally {
@@ -12,6 +12,12 @@ export const createConversation = () => api.post("/conversations/", { title: "Ne
 // 🟢 Get all conversations
 export const getAllConversations = () => api.get("/conversations/");
 
+// 🟢 Get one conversation (pass sinceMessageId to fetch only newer messages)
+export const getConversation = (id, sinceMessageId) =>
+  api.get(`/conversations/${id}/`, {
+    params: sinceMessageId ? { since_message_id: sinceMessageId } : {},
+  });
+
 // 🟢 Add message (includes AI reply)
 export const addMessage = (id, data) =>
   api.post(`/conversations/${id}/add_message/`, data);